@@ -4,7 +4,7 @@ import plotly.express as px
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
 import numpy as np
-import scipy.stats as stats
+from scipy.stats import pearsonr
 from data_processor import DataProcessor
 from map_utils import MapUtils
 from chart_utils import ChartUtils
@@ -24,11 +24,110 @@ st.set_page_config(
 def load_data():
     """Load and process all data files"""
     processor = DataProcessor()
-    return processor.load_all_data()
+    data = processor.load_all_data()
 
-def get_merged_data(processor, electricity_data, static_data, selected_year):
-    """Get merged data based on selected year"""
-    return processor.merge_consumption_with_static(electricity_data, static_data, selected_year)
+    # Precompute merged data for every year up front so reruns are dict lookups
+    electricity = data['electricity']
+    static = data['static']
+
+    # Tidy long form of the monthly consumption columns, computed once so every
+    # chart is a plain groupby instead of re-deriving the month layout
+    data['electricity_long'] = processor.melt_monthly_consumption(electricity)
+
+    # Sidebar year options, precomputed once (2020 is excluded as incomplete)
+    data['years'] = sorted(str(year) for year in electricity['Year'].unique() if year != 2020)
+    merged_by_year = {
+        str(year): processor.merge_consumption_with_static(electricity, static, str(year))
+        for year in electricity['Year'].unique()
+    }
+    merged_by_year['Alle'] = processor.merge_consumption_with_static(electricity, static, 'Alle')
+
+    # Keep each merged frame pre-sorted by consumption so top/bottom views can
+    # slice head/tail instead of re-sorting on every rerun
+    for year in merged_by_year:
+        merged_df = merged_by_year[year].sort_values(
+            'Year_total_KwH', ascending=False
+        ).reset_index(drop=True)
+
+        # Precompute the global color scale bounds for each map metric so reruns
+        # skip the full-column min/max passes
+        color_ranges = {}
+        for metric in ('kwh_per_m2', 'kwh_per_student'):
+            values = merged_df.loc[merged_df[metric] > 0, metric]
+            # Plain floats: numpy scalars in attrs break Arrow serialization
+            color_ranges[metric] = (float(values.min()), float(values.max())) if not values.empty else (0.0, 0.0)
+        merged_df.attrs['color_ranges'] = color_ranges
+
+        # Precompute sidebar option lists so reruns skip the unique/sort passes
+        merged_df.attrs['cities'] = sorted(merged_df['City'].dropna().unique().tolist())
+        merged_df.attrs['projects_by_city'] = {
+            city: sorted(group['project_name'].unique().tolist())
+            for city, group in merged_df.groupby('City', observed=True)
+        }
+
+        merged_by_year[year] = merged_df
+
+    data['merged_by_year'] = merged_by_year
+
+    # City-indexed views of the same frames so the city filter is an index
+    # lookup instead of a boolean scan (stable sort keeps consumption order)
+    data['merged_by_city'] = {
+        year: merged_df.set_index('City', drop=False).sort_index(kind='stable')
+        for year, merged_df in merged_by_year.items()
+    }
+
+    return data
+
+def filter_merged(merged, selected_city, selected_project):
+    """Slice the merged frame once with a combined city/project mask"""
+    mask = np.ones(len(merged), dtype=bool)
+    if selected_city != 'Alle':
+        mask &= (merged['City'] == selected_city).to_numpy()
+    if selected_project != 'Alle':
+        mask &= (merged['project_name'] == selected_project).to_numpy()
+    return merged[mask]
+
+@st.cache_resource
+def build_energy_map(selected_year, project_ids, color_metric, global_min, global_max):
+    """Build the Folium map once per selection and reuse the object across reruns"""
+    merged = load_data()['merged_by_year'][selected_year]
+    rows = merged[merged['project_name'].isin(project_ids)]
+    map_utils = MapUtils()
+    folium_map, _, _ = map_utils.create_energy_map(rows, color_metric, (global_min, global_max))
+    return folium_map
+
+@st.cache_data
+def compute_correlations(correlation_data):
+    """Compute Pearson correlations for the temperature analysis tab (cached)"""
+    temp_corr = pearsonr(correlation_data['Temperature'].values, correlation_data['Monthly_Consumption'].values)
+    hdd_corr = pearsonr(correlation_data['Monthly_HDD'].values, correlation_data['Monthly_Consumption'].values)
+    return temp_corr[0], hdd_corr[0]
+
+@st.cache_data
+def export_csv_bytes(selected_year, selected_city, selected_project):
+    """Encode the filtered merged data as CSV once per filter selection"""
+    merged = filter_merged(load_data()['merged_by_year'][selected_year], selected_city, selected_project)
+    return merged.to_csv(index=False).encode('utf-8')
+
+@st.cache_data
+def compute_kpis(selected_year, selected_city, selected_project):
+    """Compute dashboard KPIs for a filter selection (cached per tuple)"""
+    merged = filter_merged(load_data()['merged_by_year'][selected_year], selected_city, selected_project)
+
+    # Sum all three KPI columns in a single NumPy sweep instead of three
+    # per-column pandas reductions
+    if merged.empty:
+        total_consumption = total_students = total_area = 0
+    else:
+        values = merged[['Year_total_KwH', 'total_HE', 'Total_BRA']].to_numpy()
+        total_consumption, total_students, total_area = np.nansum(values, axis=0)
+
+    return {
+        'projects': len(merged),
+        'consumption': total_consumption,
+        'per_student': total_consumption / total_students if total_students > 0 else 0,
+        'per_m2': total_consumption / total_area if total_area > 0 else 0
+    }
 
 def main():
     st.title("🌿 Energioversikt studentboliger")
@@ -40,12 +139,11 @@ def main():
         temp_data = data['temperature']
         static_data = data['static']
         electricity_data = data['electricity']
+        electricity_long = data['electricity_long']
         
         # Initialize utilities
-        map_utils = MapUtils()
         chart_utils = ChartUtils()
-        processor = DataProcessor()
-        
+
         # Sidebar filters
         st.sidebar.header("🔍 Filter")
         
@@ -54,31 +152,29 @@ def main():
         
         # Year filter (put first so it affects merged data)
         if not show_all_data:
-            # Filter out 2020 as it's incomplete
-            years = sorted([str(year) for year in electricity_data['Year'].unique() if year != 2020])
-            selected_year = st.sidebar.radio("Velg år", years, horizontal=True)
+            selected_year = st.sidebar.radio("Velg år", data['years'], horizontal=True)
         else:
             selected_year = 'Alle'
         
-        # Get merged data based on selected year
-        merged_data = get_merged_data(processor, electricity_data, static_data, selected_year)
+        # Get merged data based on selected year (precomputed in load_data)
+        merged_data = data['merged_by_year'][selected_year]
         
         # City filter
         if not show_all_data:
-            cities = sorted(merged_data['City'].dropna().unique().tolist())
+            cities = merged_data.attrs['cities']
             selected_city = st.sidebar.radio("Velg by", cities)
         else:
             selected_city = 'Alle'
         
-        # Filter merged data by city first
+        # Filter merged data by city first (index lookup on the city-indexed view)
         if selected_city != 'Alle':
-            city_filtered_data = merged_data[merged_data['City'] == selected_city]
+            city_filtered_data = data['merged_by_city'][selected_year].loc[[selected_city]]
         else:
             city_filtered_data = merged_data
         
         # Project filter - only show projects from selected city
         if not show_all_data:
-            projects = ['Alle'] + sorted(city_filtered_data['project_name'].unique().tolist())
+            projects = ['Alle'] + merged_data.attrs['projects_by_city'].get(selected_city, [])
             # Use session state to maintain selection
             if 'selected_project' not in st.session_state:
                 st.session_state.selected_project = 'Alle'
@@ -101,78 +197,82 @@ def main():
             format_func=lambda x: 'kWh per m²' if x == 'kwh_per_m2' else 'kWh per student'
         )
         
-        # Calculate global min/max for color scaling (from all data)
-        global_values = merged_data[merged_data[color_metric] > 0][color_metric]
-        if not global_values.empty:
-            global_min = global_values.min()
-            global_max = global_values.max()
-        else:
-            global_min = global_max = 0
-        
-        # Filter data based on selections
-        filtered_merged = city_filtered_data.copy()  # Use already city-filtered data
-        filtered_electricity = electricity_data.copy()
-        filtered_temp = temp_data.copy()
-        
-        if selected_city != 'Alle':
-            filtered_electricity = filtered_electricity[filtered_electricity['City'] == selected_city]
-            filtered_temp = filtered_temp[filtered_temp['City'] == selected_city]
-        
-        if selected_year != 'Alle':
-            filtered_electricity = filtered_electricity[filtered_electricity['Year'] == int(selected_year)]
-            filtered_temp = filtered_temp[filtered_temp['Year'] == int(selected_year)]
+        # Global min/max for color scaling, precomputed alongside the merged frame
+        global_min, global_max = merged_data.attrs['color_ranges'][color_metric]
         
+        # Filter data based on selections - build one boolean mask per frame
+        # and slice each frame exactly once
+        filtered_merged = city_filtered_data  # Use already city-filtered data
         if selected_project != 'Alle':
-            filtered_merged = filtered_merged[filtered_merged['project_name'] == selected_project]
-            # Also filter electricity and temperature data by project location if specific project is selected
-            if not filtered_merged.empty:
-                project_city = filtered_merged['City'].iloc[0]
-                project_year = filtered_merged['Year'].iloc[0] if 'Year' in filtered_merged.columns else None
-                
-                # Filter temperature data by city and year if available
-                filtered_temp = temp_data[temp_data['City'] == project_city]
-                if project_year and selected_year != 'Alle':
-                    filtered_temp = filtered_temp[filtered_temp['Year'] == int(selected_year)]
-                
-                # Filter electricity data by project name
-                filtered_electricity = electricity_data[electricity_data['project_name'] == selected_project]
-                if selected_year != 'Alle':
-                    filtered_electricity = filtered_electricity[filtered_electricity['Year'] == int(selected_year)]
+            filtered_merged = city_filtered_data[city_filtered_data['project_name'] == selected_project]
+
+        electricity_mask = np.ones(len(electricity_data), dtype=bool)
+        long_mask = np.ones(len(electricity_long), dtype=bool)
+        temp_mask = np.ones(len(temp_data), dtype=bool)
+
+        if selected_project != 'Alle' and not filtered_merged.empty:
+            # A specific project pins electricity to that project and the
+            # temperature series to the project's city
+            project_city = filtered_merged['City'].iloc[0]
+            electricity_mask &= (electricity_data['project_name'] == selected_project).to_numpy()
+            long_mask &= (electricity_long['project_name'] == selected_project).to_numpy()
+            temp_mask &= (temp_data['City'] == project_city).to_numpy()
+        elif selected_city != 'Alle':
+            electricity_mask &= (electricity_data['City'] == selected_city).to_numpy()
+            long_mask &= (electricity_long['City'] == selected_city).to_numpy()
+            temp_mask &= (temp_data['City'] == selected_city).to_numpy()
+
+        if selected_year != 'Alle':
+            # Parse once and compare on the raw int32 arrays to skip pandas
+            # dispatch on the year masks
+            sel_year = int(selected_year)
+            electricity_mask &= electricity_data['Year'].values == sel_year
+            long_mask &= electricity_long['Year'].values == sel_year
+            temp_mask &= temp_data['Year'].values == sel_year
+
+        filtered_electricity = electricity_data[electricity_mask]
+        filtered_electricity_long = electricity_long[long_mask]
+        filtered_temp = temp_data[temp_mask]
         
         # Main dashboard
         col1, col2, col3, col4 = st.columns(4)
         
-        # Calculate KPIs
-        total_projects = len(filtered_merged)
-        total_consumption = filtered_merged['Year_total_KwH'].sum() if not filtered_merged.empty else 0
-        total_students = filtered_merged['total_HE'].sum() if not filtered_merged.empty else 0
-        total_area = filtered_merged['Total_BRA'].sum() if not filtered_merged.empty else 0
-        
-        avg_consumption_per_student = total_consumption / total_students if total_students > 0 else 0
-        avg_consumption_per_m2 = total_consumption / total_area if total_area > 0 else 0
-        
+        # Calculate KPIs (cached per filter tuple so tab switches skip the sums)
+        kpis = compute_kpis(selected_year, selected_city, selected_project)
+
         with col1:
-            st.metric("Totalt antall prosjekter", f"{total_projects:,}")
-        
+            st.metric("Totalt antall prosjekter", f"{kpis['projects']:,}")
+
         with col2:
-            st.metric("Totalt forbruk", f"{total_consumption:,.0f} kWh")
-        
+            st.metric("Totalt forbruk", f"{kpis['consumption']:,.0f} kWh")
+
         with col3:
-            st.metric("kWh per student", f"{avg_consumption_per_student:.1f}")
-        
+            st.metric("kWh per student", f"{kpis['per_student']:.1f}")
+
         with col4:
-            st.metric("kWh per m²", f"{avg_consumption_per_m2:.1f}")
+            st.metric("kWh per m²", f"{kpis['per_m2']:.1f}")
         
-        # Create tabs for different views
-        tab1, tab2, tab3, tab4 = st.tabs(["🗺️ Interaktivt kart", "📊 Energianalyse", "🌡️ Temperaturanalyse", "📈 Sammenligning"])
-        
-        with tab1:
+        # Track the active view in session state so only the visible section
+        # builds its charts on each rerun (st.tabs would execute all four)
+        tab_labels = ["🗺️ Interaktivt kart", "📊 Energianalyse", "🌡️ Temperaturanalyse", "📈 Sammenligning"]
+        active_tab = st.radio(
+            "Visning", tab_labels, horizontal=True,
+            key="active_tab", label_visibility="collapsed"
+        )
+
+        if active_tab == tab_labels[0]:
             st.subheader("Studentboliger - Interaktivt kart")
             
             if not filtered_merged.empty:
                 # Create map with selected color metric using global min/max
-                folium_map, _, _ = map_utils.create_energy_map(filtered_merged, color_metric, (global_min, global_max))
-                st_folium(folium_map, width=1200, height=900)
+                # (cached on the visible rows so tab switches reuse the object)
+                folium_map = build_energy_map(
+                    selected_year, tuple(filtered_merged['project_name']), color_metric, global_min, global_max
+                )
+                # Render-only embed: the app never reads map state back, so ask
+                # st_folium to return nothing and keep a stable widget key to
+                # avoid re-serializing the payload on unrelated reruns
+                st_folium(folium_map, width=1200, height=900, returned_objects=[], key='energy_map')
                 
                 # Dynamic map legend based on global data range
                 metric_name = 'kWh per m²' if color_metric == 'kwh_per_m2' else 'kWh per student'
@@ -187,12 +287,12 @@ def main():
             else:
                 st.warning("Ingen data tilgjengelig for de valgte filtrene.")
         
-        with tab2:
+        elif active_tab == tab_labels[1]:
             st.subheader("Energiforbruksanalyse")
             
             if not filtered_electricity.empty:
-                # Monthly consumption trends
-                monthly_chart = chart_utils.create_monthly_consumption_chart(filtered_electricity)
+                # Monthly consumption trends from the precomputed tidy frame
+                monthly_chart = chart_utils.create_monthly_consumption_chart(filtered_electricity_long)
                 st.plotly_chart(monthly_chart, use_container_width=True)
                 
                 # Top consumers
@@ -200,23 +300,26 @@ def main():
                 
                 with col1:
                     top_consumers_chart = chart_utils.create_top_consumers_chart(filtered_merged)
-                    st.plotly_chart(top_consumers_chart, use_container_width=True)
+                    st.plotly_chart(top_consumers_chart, use_container_width=False,
+                                    config={'responsive': False, 'displaylogo': False})
                 
                 with col2:
                     # Use merged data for efficiency chart
                     if not filtered_merged.empty:
                         efficiency_chart = chart_utils.create_efficiency_chart_from_merged(filtered_merged)
-                        st.plotly_chart(efficiency_chart, use_container_width=True)
+                        st.plotly_chart(efficiency_chart, use_container_width=False,
+                                        config={'responsive': False, 'displaylogo': False})
             else:
                 st.warning("Ingen strømforbruksdata tilgjengelig for de valgte filtrene.")
         
-        with tab3:
+        elif active_tab == tab_labels[2]:
             st.subheader("Temperatur og Graddager Analyse")
             
             if not filtered_temp.empty and not filtered_electricity.empty:
-                # Enhanced temperature vs consumption correlation with degree days
+                # Enhanced temperature vs consumption correlation with degree days,
+                # fed from the precomputed tidy frame
                 correlation_chart = chart_utils.create_temperature_correlation_chart(
-                    filtered_temp, filtered_electricity
+                    filtered_temp, filtered_electricity_long
                 )
                 st.plotly_chart(correlation_chart, use_container_width=True)
                 
@@ -227,29 +330,28 @@ def main():
                 """)
                 
                 # Show correlation statistics if available
-                correlation_data = chart_utils.merge_temp_consumption_data(filtered_temp, filtered_electricity)
+                correlation_data = chart_utils.merge_temp_consumption_data(filtered_temp, filtered_electricity_long)
                 if not correlation_data.empty and len(correlation_data) > 1:
-                    # Calculate correlations
-                    temp_corr = stats.pearsonr(correlation_data['Temperature'], correlation_data['Monthly_Consumption'])
-                    hdd_corr = stats.pearsonr(correlation_data['Monthly_HDD'], correlation_data['Monthly_Consumption'])
-                    
+                    # Calculate correlations (cached on the correlation frame)
+                    temp_corr, hdd_corr = compute_correlations(correlation_data)
+
                     col1, col2 = st.columns(2)
                     with col1:
                         st.metric(
-                            "Korrelasjon: Temperatur vs Forbruk", 
-                            f"{temp_corr[0]:.3f}",
+                            "Korrelasjon: Temperatur vs Forbruk",
+                            f"{temp_corr:.3f}",
                             help="Negativ verdi = lavere temperatur gir høyere forbruk"
                         )
                     with col2:
                         st.metric(
-                            "Korrelasjon: Graddager vs Forbruk", 
-                            f"{hdd_corr[0]:.3f}",
+                            "Korrelasjon: Graddager vs Forbruk",
+                            f"{hdd_corr:.3f}",
                             help="Positiv verdi = flere graddager gir høyere forbruk"
                         )
             else:
                 st.warning("Utilstrekkelige data for temperaturanalyse.")
         
-        with tab4:
+        else:
             st.subheader("Sammenligning")
             
             # Multi-project selection for comparison
@@ -291,10 +393,12 @@ def main():
                     col1, col2 = st.columns(2)
                     with col1:
                         comparison_chart_student = chart_utils.create_project_comparison_chart_student(comparison_data)
-                        st.plotly_chart(comparison_chart_student, use_container_width=True)
+                        st.plotly_chart(comparison_chart_student, use_container_width=False,
+                                        config={'responsive': False, 'displaylogo': False})
                     with col2:
                         comparison_chart_m2 = chart_utils.create_project_comparison_chart_m2(comparison_data)
-                        st.plotly_chart(comparison_chart_m2, use_container_width=True)
+                        st.plotly_chart(comparison_chart_m2, use_container_width=False,
+                                        config={'responsive': False, 'displaylogo': False})
                 else:
                     st.warning("Ingen data tilgjengelig for de valgte prosjektene.")
             else:
@@ -304,17 +408,16 @@ def main():
                     
                     with col1:
                         st.write("**Høyt forbruk (Topp 25%)**")
-                        high_consumption = filtered_merged.nlargest(max(1, len(filtered_merged)//4), 'Year_total_KwH')
+                        # Frame is pre-sorted by consumption, so top 25% is a head slice
+                        high_consumption = filtered_merged.head(max(1, len(filtered_merged)//4))
                         st.dataframe(high_consumption[['project_name', 'City', 'Year_total_KwH', 'kwh_per_student', 'kwh_per_m2']])
-                    
+
                     with col2:
                         st.write("**Lavt forbruk (Bunn 25%)**")
-                        filtered_for_low = filtered_merged[filtered_merged['Year_total_KwH'] > 0]
-                        if not filtered_for_low.empty:
-                            low_consumption = filtered_for_low.nsmallest(max(1, len(filtered_for_low)//4), 'Year_total_KwH')
-                            st.dataframe(low_consumption[['project_name', 'City', 'Year_total_KwH', 'kwh_per_student', 'kwh_per_m2']])
-                        else:
-                            st.write("Ingen data med forbruk > 0")
+                        # Merged frames only contain projects with consumption > 0,
+                        # so the bottom quartile is the tail of the descending sort
+                        low_consumption = filtered_merged.tail(max(1, len(filtered_merged)//4)).iloc[::-1]
+                        st.dataframe(low_consumption[['project_name', 'City', 'Year_total_KwH', 'kwh_per_student', 'kwh_per_m2']])
                     
                     # Efficiency scatter plot
                     efficiency_scatter = chart_utils.create_efficiency_scatter(filtered_merged)
@@ -326,15 +429,14 @@ def main():
         st.sidebar.markdown("---")
         st.sidebar.subheader("📥 Eksporter data")
         
-        if st.sidebar.button("Last ned analyseresultater"):
-            # Prepare export data using merged data
-            csv = filtered_merged.to_csv(index=False)
-            st.sidebar.download_button(
-                label="Last ned CSV",
-                data=csv,
-                file_name=f"miljofyrtarn_analyse_{selected_city}_{selected_year}.csv",
-                mime="text/csv"
-            )
+        # Single download button backed by a cached CSV encoding, so reruns
+        # don't re-serialize the frame
+        st.sidebar.download_button(
+            label="Last ned analyseresultater",
+            data=export_csv_bytes(selected_year, selected_city, selected_project),
+            file_name=f"miljofyrtarn_analyse_{selected_city}_{selected_year}.csv",
+            mime="text/csv"
+        )
     
     except Exception as e:
         st.error(f"Error loading data: {str(e)}")
@@ -1,172 +1,324 @@
 import plotly.express as px
 import plotly.graph_objects as go
+import plotly.io as pio
 from plotly.subplots import make_subplots
+from concurrent.futures import ThreadPoolExecutor
 import pandas as pd
 import numpy as np
+import streamlit as st
+
+_COLOR_PALETTE = {
+    'primary': '#2E7D32',
+    'secondary': '#1976D2',
+    'accent': '#FFA726',
+    'success': '#4CAF50',
+    'warning': '#FF9800',
+    'error': '#F44336'
+}
+
+# Register the shared styling once at import time so every figure starts from
+# the same template instead of re-stating layout kwargs per chart
+pio.templates['ecocampus'] = go.layout.Template(
+    layout=go.Layout(colorway=list(_COLOR_PALETTE.values()))
+)
+pio.templates.default = 'plotly_white+ecocampus'
+
+# Serialize figures with orjson, which encodes ndarray traces natively
+try:
+    pio.json.config.default_engine = 'orjson'
+except ValueError:
+    # orjson not installed; keep the stdlib encoder
+    pass
 
 class ChartUtils:
+    # Display labels keyed by month number (matching the tidy long frame)
+    MONTH_LABELS = {
+        1: 'Jan', 2: 'Feb', 3: 'Mar', 4: 'Apr', 5: 'May', 6: 'Jun',
+        7: 'Jul', 8: 'Aug', 9: 'Sep', 10: 'Oct', 11: 'Nov', 12: 'Dec'
+    }
+    MONTH_NAMES_NO = {
+        1: 'Januar', 2: 'Februar', 3: 'Mars', 4: 'April', 5: 'Mai', 6: 'Juni',
+        7: 'Juli', 8: 'August', 9: 'September', 10: 'Oktober', 11: 'November', 12: 'Desember'
+    }
+
+    # Horizontal pixel budget for M4 downsampling; traces are capped at four
+    # points (first/last/min/max) per on-screen column
+    M4_PIXEL_BUDGET = 800
+
     def __init__(self):
-        self.color_palette = {
-            'primary': '#2E7D32',
-            'secondary': '#1976D2',
-            'accent': '#FFA726',
-            'success': '#4CAF50',
-            'warning': '#FF9800',
-            'error': '#F44336'
-        }
+        self.color_palette = _COLOR_PALETTE
+
+    @staticmethod
+    def _empty_fig(title, text="Ingen data tilgjengelig", font_size=16):
+        """Annotated placeholder figure for empty or failed chart builds"""
+        fig = go.Figure()
+        fig.add_annotation(
+            text=text,
+            xref="paper", yref="paper",
+            x=0.5, y=0.5, xanchor='center', yanchor='middle',
+            showarrow=False, font_size=font_size
+        )
+        fig.update_layout(title=title)
+        return fig
     
-    def create_monthly_consumption_chart(self, electricity_df):
-        """Create monthly consumption trends chart"""
-        # Get monthly columns
-        monthly_columns = [col for col in electricity_df.columns if 'KwH' in col and col != 'Year_total_KwH']
-        
-        # Calculate monthly totals by year
-        yearly_monthly_data = []
-        
-        for year in electricity_df['Year'].unique():
-            year_data = electricity_df[electricity_df['Year'] == year]
-            for col in monthly_columns:
-                month_name = col.replace('_KwH', '').replace('__KwH', '').replace('_', ' ').title()
-                total = year_data[col].sum()
-                yearly_monthly_data.append({
-                    'Year': year,
-                    'Month': month_name,
-                    'Total_KwH': total
-                })
-        
-        monthly_df = pd.DataFrame(yearly_monthly_data)
+    @st.cache_data(show_spinner=False)
+    def create_monthly_consumption_chart(_self, electricity_long):
+        """Create monthly consumption trends chart from the tidy long frame"""
+        # Skip the aggregation entirely when there is nothing to plot
+        if electricity_long.empty:
+            return _self._empty_fig('Månedlige Energiforbrukstrender')
+
+        # Calculate monthly totals by year in one groupby pass
+        monthly_df = electricity_long.groupby(
+            ['Year', 'Month'], as_index=False, observed=True
+        )['KwH'].sum().sort_values(['Year', 'Month'])
+        monthly_df = monthly_df.rename(columns={'KwH': 'Total_KwH'})
+        monthly_df['Month'] = monthly_df['Month'].map(_self.MONTH_LABELS)
         
         if not monthly_df.empty:
-            fig = px.line(
-                monthly_df, 
-                x='Month', 
-                y='Total_KwH', 
-                color='Year',
-                title='Månedlige Energiforbrukstrender',
-                labels={'Total_KwH': 'Totalt Forbruk (kWh)', 'Month': 'Måned', 'Year': 'År'}
-            )
-            
+            # Build traces straight from arrays; px.line would re-inspect the
+            # frame and redo the per-year split internally
+            traces = [
+                go.Scatter(
+                    x=year_df['Month'].to_numpy(),
+                    y=year_df['Total_KwH'].to_numpy(),
+                    name=str(year),
+                    mode='lines'
+                )
+                for year, year_df in monthly_df.groupby('Year', sort=False)
+            ]
+
+            fig = go.Figure(data=traces)
             fig.update_layout(
+                title='Månedlige Energiforbrukstrender',
+                legend_title_text='År',
                 xaxis_title='Måned',
                 yaxis_title='Totalt Forbruk (kWh)',
-                hovermode='x unified'
+                hovermode='x unified',
+                uirevision='static'
             )
-            
+
             return fig
         else:
-            # Return empty chart
-            fig = go.Figure()
-            fig.add_annotation(
-                text="Ingen data tilgjengelig",
-                xref="paper", yref="paper",
-                x=0.5, y=0.5, xanchor='center', yanchor='middle',
-                showarrow=False, font_size=16
-            )
-            fig.update_layout(title='Månedlige Energiforbrukstrender')
-            return fig
+            return _self._empty_fig('Månedlige Energiforbrukstrender')
     
-    def create_top_consumers_chart(self, merged_df):
+    @st.cache_data(show_spinner=False)
+    def create_top_consumers_chart(_self, merged_df):
         """Create top 5 consumers chart with efficiency metrics"""
-        # Filter valid data and get top 5
-        valid_data = merged_df[
-            (merged_df['Year_total_KwH'] > 0) & 
-            (merged_df['kwh_per_student'] > 0) & 
-            (merged_df['kwh_per_m2'] > 0)
-        ].copy()
+        # Filter valid data and get top 5; fuse the comparisons into one
+        # reusable mask instead of three boolean temporaries
+        mask = merged_df['Year_total_KwH'].to_numpy() > 0
+        mask &= merged_df['kwh_per_student'].to_numpy() > 0
+        mask &= merged_df['kwh_per_m2'].to_numpy() > 0
+        valid_data = merged_df[mask]
         
         if valid_data.empty:
-            fig = go.Figure()
-            fig.add_annotation(
-                text="Ingen data tilgjengelig",
-                xref="paper", yref="paper",
-                x=0.5, y=0.5, xanchor='center', yanchor='middle',
-                showarrow=False, font_size=16
-            )
-            fig.update_layout(title='Topp 5 Høyeste Forbrukere')
-            return fig
-            
+            return _self._empty_fig('Topp 5 Høyeste Forbrukere')
+
+        # nlargest is already a bounded partial sort; gathering rows through
+        # the index instead would misbehave on the duplicate-label city view
         top_consumers = valid_data.nlargest(5, 'Year_total_KwH')
         
+        # Extract each plotted column once and round in a single numpy pass
+        project_names = top_consumers['project_name'].to_numpy()
+        student_vals = top_consumers['kwh_per_student'].to_numpy()
+        m2_vals = top_consumers['kwh_per_m2'].to_numpy()
+
         fig = go.Figure()
-        
-        # Add kWh per student bars
-        fig.add_trace(go.Bar(
-            name='kWh per student',
-            x=top_consumers['project_name'],
-            y=top_consumers['kwh_per_student'],
-            marker_color='lightblue',
-            text=top_consumers['kwh_per_student'].round(0),
-            textposition='auto',
-        ))
-        
-        # Add kWh per m² bars
-        fig.add_trace(go.Bar(
-            name='kWh per m²',
-            x=top_consumers['project_name'],
-            y=top_consumers['kwh_per_m2'],
-            marker_color='lightcoral',
-            text=top_consumers['kwh_per_m2'].round(0),
-            textposition='auto',
-            opacity=0.7
-        ))
+
+        # Add both metric bars in one batched call
+        fig.add_traces([
+            go.Bar(
+                name='kWh per student',
+                x=project_names,
+                y=student_vals,
+                marker_color='lightblue',
+                text=np.rint(student_vals),
+                textposition='auto',
+            ),
+            go.Bar(
+                name='kWh per m²',
+                x=project_names,
+                y=m2_vals,
+                marker_color='lightcoral',
+                text=np.rint(m2_vals),
+                textposition='auto',
+                opacity=0.7
+            ),
+        ])
         
         fig.update_layout(
             title='Topp 5 Høyeste Forbrukere',
             xaxis_title='Prosjekt',
             yaxis_title='Forbruk',
             barmode='group',
-            showlegend=True
+            showlegend=True,
+            uirevision='static'
+        )
+
+        # The frame is already ranked by nlargest; hand the order to Plotly so
+        # the client skips its own category sort
+        fig.update_xaxes(
+            categoryorder='array',
+            categoryarray=top_consumers['project_name'].to_numpy()
         )
         
         return fig
     
-    def create_efficiency_chart_from_merged(self, merged_df):
-        """Create efficiency chart showing kWh per student vs kWh per m²"""
-        # Filter out projects with no consumption or capacity data
-        efficiency_df = merged_df[
-            (merged_df['Year_total_KwH'] > 0) & 
-            (merged_df['kwh_per_student'] > 0) &
-            (merged_df['kwh_per_m2'] > 0)
-        ].copy()
-        
-        if not efficiency_df.empty:
-            fig = px.scatter(
-                efficiency_df,
-                x='kwh_per_m2',
-                y='kwh_per_student',
-                size='Year_total_KwH',
-                color='City',
-                hover_data=['project_name', 'Year_total_KwH'],
-                title='Energieffektivitet: kWh per Student vs kWh per m²',
-                labels={
-                    'kwh_per_m2': 'kWh per m²',
-                    'kwh_per_student': 'kWh per Student',
-                    'Year_total_KwH': 'Totalt Forbruk'
-                }
-            )
-            
-            fig.update_layout(
-                xaxis_title='kWh per m²',
-                yaxis_title='kWh per Student'
-            )
-            
-            return fig
-        else:
-            fig = go.Figure()
-            fig.add_annotation(
-                text="Ingen effektivitetsdata tilgjengelig",
-                xref="paper", yref="paper",
-                x=0.5, y=0.5, xanchor='center', yanchor='middle',
-                showarrow=False, font_size=16
-            )
-            fig.update_layout(title='Energieffektivitetsanalyse')
-            return fig
-    
-    def create_temperature_correlation_chart(self, temp_df, electricity_df):
+    @staticmethod
+    def _m4_downsample(df, x_col, y_col, n_pixels=None):
+        """Thin a scatter projection with M4 binning before plotting
+
+        Keeps first/last/min/max per x-bucket so the trace size tracks pixel
+        width instead of row count. Frames within the budget pass through.
+        """
+        if n_pixels is None:
+            n_pixels = ChartUtils.M4_PIXEL_BUDGET
+        if len(df) <= 4 * n_pixels:
+            return df
+
+        x = df[x_col].to_numpy()
+        y = df[y_col].to_numpy()
+        order = np.argsort(x, kind='stable')
+
+        keep = set()
+        for bucket in np.array_split(order, n_pixels):
+            if len(bucket) == 0:
+                continue
+            y_bucket = y[bucket]
+            keep.update((bucket[0], bucket[-1],
+                         bucket[np.argmin(y_bucket)], bucket[np.argmax(y_bucket)]))
+
+        return df.iloc[sorted(keep)]
+
+    def _build_temperature_traces(_self, temp_df):
+        """Temperature and degree-day lines for subplot (1, 1)
+
+        All cities share two NaN-separated traces so the payload carries one
+        JS path per metric instead of two traces per city.
+        """
+        if temp_df.empty:
+            return []
+
+        # One multi-key sort up front; groupby then streams contiguous slices
+        temp_sorted = temp_df.sort_values(['City', 'Year', 'Month'], kind='mergesort')
+
+        xs, temps, hdds, cities = [], [], [], []
+        for city, city_temp in temp_sorted.groupby('City', sort=False, observed=True):
+            # Thin long series down to the pixel budget; the ordinal keeps the
+            # buckets chronological since Time labels do not sort lexically
+            if len(city_temp) > 4 * _self.M4_PIXEL_BUDGET:
+                city_temp = city_temp.assign(_ord=np.arange(len(city_temp)))
+                city_temp = _self._m4_downsample(city_temp, '_ord', 'Temperature')
+
+            xs.append(city_temp['Time'].to_numpy())
+            temps.append(city_temp['Temperature'].to_numpy())
+            hdds.append(city_temp['Monthly_HDD'].to_numpy())
+            cities.append(np.repeat(str(city), len(city_temp)))
+
+            # A NaN row breaks the line at the city boundary
+            xs.append(xs[-1][-1:])
+            temps.append([np.nan])
+            hdds.append([np.nan])
+            cities.append([''])
+
+        if not xs:
+            return []
+
+        time_values = np.concatenate(xs)
+        city_labels = np.concatenate(cities)
+
+        return [
+            (
+                go.Scatter(
+                    x=time_values,
+                    y=np.concatenate(temps),
+                    name="Temperatur",
+                    line=dict(color='blue', width=2),
+                    text=city_labels,
+                    hovertemplate="<b>%{text}</b> %{x}<br>%{y:.1f}°C<extra></extra>"
+                ),
+                False
+            ),
+            (
+                go.Scatter(
+                    x=time_values,
+                    y=np.concatenate(hdds),
+                    name="Graddager",
+                    line=dict(color='red', width=2, dash='dash'),
+                    text=city_labels,
+                    hovertemplate="<b>%{text}</b> %{x}<br>%{y:.0f} graddager<extra></extra>"
+                ),
+                True
+            ),
+        ]
+
+    def _build_consumption_bar(_self, monthly_consumption):
+        """Monthly consumption bar for subplot (1, 2)"""
+        if monthly_consumption.empty:
+            return []
+        return [go.Bar(
+            x=monthly_consumption['Month'].to_numpy(),
+            y=monthly_consumption['Total_Consumption'].to_numpy(),
+            name="Totalt Forbruk",
+            marker_color='green',
+            opacity=0.7
+        )]
+
+    def _build_hdd_scatter(_self, correlation_data):
+        """Degree days vs consumption scatter for subplot (2, 1)"""
+        if correlation_data.empty:
+            return []
+        hdd_scatter = _self._m4_downsample(correlation_data, 'Monthly_HDD', 'Monthly_Consumption')
+        return [go.Scattergl(
+            x=hdd_scatter['Monthly_HDD'].to_numpy(),
+            y=hdd_scatter['Monthly_Consumption'].to_numpy(),
+            mode='markers',
+            name="Graddager vs Forbruk",
+            marker=dict(
+                size=8,
+                color=hdd_scatter['Temperature'].to_numpy(),
+                colorscale='RdYlBu_r',
+                showscale=True,
+                colorbar=dict(title="Temp (°C)", x=1.1, len=0.5)
+            ),
+            text=hdd_scatter['Time'].to_numpy(),
+            hovertemplate="<b>%{text}</b><br>" +
+                         "Graddager: %{x:.0f}<br>" +
+                         "Forbruk: %{y:,.0f} kWh<br>" +
+                         "Temperatur: %{marker.color:.1f}°C<extra></extra>"
+        )]
+
+    def _build_temperature_scatter(_self, correlation_data):
+        """Temperature vs consumption scatter for subplot (2, 2)"""
+        if correlation_data.empty:
+            return []
+        temp_scatter = _self._m4_downsample(correlation_data, 'Temperature', 'Monthly_Consumption')
+        return [go.Scattergl(
+            x=temp_scatter['Temperature'].to_numpy(),
+            y=temp_scatter['Monthly_Consumption'].to_numpy(),
+            mode='markers',
+            name="Temperatur vs Forbruk",
+            marker=dict(
+                size=10,
+                color='orange',
+                opacity=0.7
+            ),
+            text=temp_scatter['Time'].to_numpy(),
+            hovertemplate="<b>%{text}</b><br>" +
+                         "Temperatur: %{x:.1f}°C<br>" +
+                         "Forbruk: %{y:,.0f} kWh<extra></extra>"
+        )]
+
+    @st.cache_data(show_spinner=False)
+    def create_temperature_correlation_chart(_self, temp_df, electricity_long):
         """Create comprehensive temperature and consumption correlation analysis"""
+        if temp_df.empty:
+            return _self._empty_fig('Temperatur og Forbruk Korrelasjon')
+
         try:
             # Prepare monthly consumption data
-            monthly_consumption = self.prepare_monthly_consumption_data(electricity_df)
+            monthly_consumption = _self.prepare_monthly_consumption_data(electricity_long)
             
             # Create subplots with multiple charts
             fig = make_subplots(
@@ -178,103 +330,44 @@ class ChartUtils:
                 vertical_spacing=0.15
             )
             
-            # Chart 1: Temperature and Degree Days over time
-            cities = temp_df['City'].unique()
-            for city in cities:
-                city_temp = temp_df[temp_df['City'] == city].copy()
-                if not city_temp.empty:
-                    # Sort by year and month for proper time series
-                    city_temp = city_temp.sort_values(['Year', 'Month'])
-                    
-                    # Add temperature line
-                    fig.add_trace(
-                        go.Scatter(
-                            x=city_temp['Time'],
-                            y=city_temp['Temperature'],
-                            name=f"{city} Temperatur",
-                            line=dict(color='blue', width=2),
-                            legendgroup=city
-                        ),
-                        row=1, col=1, secondary_y=False
-                    )
-                    
-                    # Add degree days line
-                    fig.add_trace(
-                        go.Scatter(
-                            x=city_temp['Time'],
-                            y=city_temp['Monthly_HDD'],
-                            name=f"{city} Graddager",
-                            line=dict(color='red', width=2, dash='dash'),
-                            legendgroup=city
-                        ),
-                        row=1, col=1, secondary_y=True
-                    )
-            
-            # Chart 2: Monthly consumption trends
-            if not monthly_consumption.empty:
-                fig.add_trace(
-                    go.Bar(
-                        x=monthly_consumption['Month'],
-                        y=monthly_consumption['Total_Consumption'],
-                        name="Totalt Forbruk",
-                        marker_color='green',
-                        opacity=0.7
-                    ),
-                    row=1, col=2
-                )
-            
-            # Chart 3: Degree Days vs Consumption scatter
-            correlation_data = self.merge_temp_consumption_data(temp_df, electricity_df)
-            if not correlation_data.empty:
-                fig.add_trace(
-                    go.Scatter(
-                        x=correlation_data['Monthly_HDD'],
-                        y=correlation_data['Monthly_Consumption'],
-                        mode='markers',
-                        name="Graddager vs Forbruk",
-                        marker=dict(
-                            size=8,
-                            color=correlation_data['Temperature'],
-                            colorscale='RdYlBu_r',
-                            showscale=True,
-                            colorbar=dict(title="Temp (°C)", x=1.1, len=0.5)
-                        ),
-                        text=correlation_data['Time'],
-                        hovertemplate="<b>%{text}</b><br>" +
-                                     "Graddager: %{x:.0f}<br>" +
-                                     "Forbruk: %{y:,.0f} kWh<br>" +
-                                     "Temperatur: %{marker.color:.1f}°C<extra></extra>"
-                    ),
-                    row=2, col=1
-                )
-            
-            # Chart 4: Temperature vs Consumption scatter
-            if not correlation_data.empty:
-                fig.add_trace(
-                    go.Scatter(
-                        x=correlation_data['Temperature'],
-                        y=correlation_data['Monthly_Consumption'],
-                        mode='markers',
-                        name="Temperatur vs Forbruk",
-                        marker=dict(
-                            size=10,
-                            color='orange',
-                            opacity=0.7
-                        ),
-                        text=correlation_data['Time'],
-                        hovertemplate="<b>%{text}</b><br>" +
-                                     "Temperatur: %{x:.1f}°C<br>" +
-                                     "Forbruk: %{y:,.0f} kWh<extra></extra>"
-                    ),
-                    row=2, col=2
-                )
+            correlation_data = _self.merge_temp_consumption_data(temp_df, electricity_long)
+
+            # Build the four independent trace payloads in parallel; pandas and
+            # numpy release the GIL on the bulk operations involved
+            with ThreadPoolExecutor(max_workers=4) as pool:
+                temperature_traces = pool.submit(_self._build_temperature_traces, temp_df)
+                consumption_traces = pool.submit(_self._build_consumption_bar, monthly_consumption)
+                hdd_traces = pool.submit(_self._build_hdd_scatter, correlation_data)
+                temp_scatter_traces = pool.submit(_self._build_temperature_scatter, correlation_data)
+
+            # Attach all traces in one batched call so the figure schema is
+            # validated once, keeping the subplot order stable
+            traces, rows, cols, secondary_ys = [], [], [], []
+            for trace, secondary_y in temperature_traces.result():
+                traces.append(trace)
+                rows.append(1)
+                cols.append(1)
+                secondary_ys.append(secondary_y)
+            for subplot, trace_list in (
+                ((1, 2), consumption_traces.result()),
+                ((2, 1), hdd_traces.result()),
+                ((2, 2), temp_scatter_traces.result()),
+            ):
+                for trace in trace_list:
+                    traces.append(trace)
+                    rows.append(subplot[0])
+                    cols.append(subplot[1])
+                    secondary_ys.append(False)
+
+            fig.add_traces(traces, rows=rows, cols=cols, secondary_ys=secondary_ys)
             
             # Update layout
             fig.update_layout(
                 title="Temperatur og Energiforbruk Analyse",
                 height=900,
                 showlegend=True,
-                legend=dict(x=1.05, y=1)
+                legend=dict(x=1.05, y=1),
+                uirevision='static'
             )
             
             # Update axes labels
@@ -294,116 +387,97 @@ class ChartUtils:
             return fig
             
         except Exception as e:
-            fig = go.Figure()
-            fig.add_annotation(
+            return _self._empty_fig(
+                'Temperatur og Forbruk Korrelasjon',
                 text=f"Feil ved oppretting av temperaturanalyse: {str(e)}",
-                xref="paper", yref="paper",
-                x=0.5, y=0.5, xanchor='center', yanchor='middle',
-                showarrow=False, font_size=14
+                font_size=14
             )
-            fig.update_layout(title='Temperatur og Forbruk Korrelasjon')
-            return fig
     
-    def prepare_monthly_consumption_data(self, electricity_df):
+    @st.cache_data(show_spinner=False)
+    def prepare_monthly_consumption_data(_self, electricity_long):
         """Prepare monthly consumption data for analysis"""
-        try:
-            monthly_columns = [col for col in electricity_df.columns if 'KwH' in col and col != 'Year_total_KwH']
-            monthly_data = []
-            
-            month_map = {
-                'Jan_KwH': 'Januar', 'Feb_KwH': 'Februar', 'Mar_KwH': 'Mars',
-                'Apr__KwH': 'April', 'may__KwH': 'Mai', 'Jun_KwH': 'Juni',
-                'Jul_KwH': 'Juli', 'Aug_KwH': 'August', 'Sep_KwH': 'September',
-                'Oct_KwH': 'Oktober', 'Nov_KwH': 'November', 'Dec_KwH': 'Desember'
-            }
-            
-            for col in monthly_columns:
-                month_name = month_map.get(col, col.replace('_KwH', '').replace('__KwH', ''))
-                total = electricity_df[col].sum()
-                monthly_data.append({
-                    'Month': month_name,
-                    'Total_Consumption': total
-                })
-            
-            return pd.DataFrame(monthly_data)
-        except:
+        if electricity_long.empty or 'Month' not in electricity_long.columns:
             return pd.DataFrame()
+
+        monthly_data = electricity_long.groupby(
+            'Month', as_index=False, observed=True
+        )['KwH'].sum().sort_values('Month')
+        monthly_data = monthly_data.rename(columns={'KwH': 'Total_Consumption'})
+        monthly_data['Month'] = monthly_data['Month'].map(_self.MONTH_NAMES_NO)
+
+        return monthly_data
     
-    def merge_temp_consumption_data(self, temp_df, electricity_df):
+    @st.cache_data(show_spinner=False)
+    def merge_temp_consumption_data(_self, temp_df, electricity_long):
         """Merge temperature and consumption data for correlation analysis"""
-        try:
-            # Get monthly consumption by city and month
-            monthly_columns = [col for col in electricity_df.columns if 'KwH' in col and col != 'Year_total_KwH']
-            
-            correlation_data = []
-            
-            for _, temp_row in temp_df.iterrows():
-                city = temp_row['City']
-                year = temp_row['Year']
-                month = temp_row['Month']
-                
-                # Find matching electricity data
-                city_elec = electricity_df[
-                    (electricity_df['City'] == city) & 
-                    (electricity_df['Year'] == year)
-                ]
-                
-                if not city_elec.empty:
-                    # Map month number to consumption column
-                    month_col_map = {
-                        1: 'Jan_KwH', 2: 'Feb_KwH', 3: 'Mar_KwH', 4: 'Apr__KwH',
-                        5: 'may__KwH', 6: 'Jun_KwH', 7: 'Jul_KwH', 8: 'Aug_KwH',
-                        9: 'Sep_KwH', 10: 'Oct_KwH', 11: 'Nov_KwH', 12: 'Dec_KwH'
-                    }
-                    
-                    consumption_col = month_col_map.get(month)
-                    if consumption_col and consumption_col in city_elec.columns:
-                        monthly_consumption = city_elec[consumption_col].sum()
-                        
-                        correlation_data.append({
-                            'City': city,
-                            'Year': year,
-                            'Month': month,
-                            'Time': temp_row['Time'],
-                            'Temperature': temp_row['Temperature'],
-                            'HDD_17': temp_row['HDD_17'],
-                            'Monthly_HDD': temp_row['Monthly_HDD'],
-                            'Monthly_Consumption': monthly_consumption
-                        })
-            
-            return pd.DataFrame(correlation_data)
-        except:
+        temp_columns = ['City', 'Year', 'Month', 'Time', 'Temperature', 'HDD_17', 'Monthly_HDD']
+        if not {'City', 'Year', 'Month', 'KwH'}.issubset(electricity_long.columns) \
+                or not set(temp_columns).issubset(temp_df.columns):
             return pd.DataFrame()
+
+        # Aggregate the tidy long frame per (City, Year, Month) and join the
+        # temperature rows in a single vectorized merge
+        monthly_consumption = electricity_long.groupby(
+            ['City', 'Year', 'Month'], as_index=False, observed=True
+        )['KwH'].sum().rename(columns={'KwH': 'Monthly_Consumption'})
+
+        return pd.merge(
+            temp_df[temp_columns], monthly_consumption,
+            on=['City', 'Year', 'Month'], how='inner'
+        )
     
-    def prepare_comparison_data(self, electricity_df, static_df):
-        """Prepare data for comparative analysis"""
-        from data_processor import DataProcessor
-        processor = DataProcessor()
-        merged_df = processor.merge_consumption_with_static(electricity_df, static_df)
-        
-        # Calculate additional metrics
-        comparison_df = merged_df[merged_df['Year_total_KwH'] > 0].copy()
-        comparison_df['total_consumption'] = comparison_df['Year_total_KwH']
-        comparison_df['city'] = comparison_df['City']
-        
-        return comparison_df[['project_name', 'city', 'total_consumption', 'kwh_per_student', 'kwh_per_m2']].dropna()
+    @st.cache_data(show_spinner=False)
+    def prepare_comparison_data(_self, merged_df):
+        """Prepare data for comparative analysis from an already-merged frame"""
+        # Select and rename in one pass instead of copying the whole frame
+        # and duplicating columns
+        comparison_df = merged_df.loc[
+            merged_df['Year_total_KwH'] > 0,
+            ['project_name', 'City', 'Year_total_KwH', 'kwh_per_student', 'kwh_per_m2']
+        ].rename(columns={'City': 'city', 'Year_total_KwH': 'total_consumption'})
+
+        return comparison_df.dropna()
     
-    def create_efficiency_scatter(self, merged_df):
+    def _efficiency_figure(_self, efficiency_df, x, y, hover_data, title, labels):
+        """Shared WebGL efficiency scatter used by both efficiency charts"""
+        fig = px.scatter(
+            efficiency_df,
+            x=x,
+            y=y,
+            size='Year_total_KwH',
+            color='City',
+            hover_data=hover_data,
+            render_mode='webgl',
+            title=title,
+            labels=labels
+        )
+
+        # closest-point hover with spikes disabled avoids the O(N)
+        # nearest-trace scan on dense WebGL scatters
+        fig.update_layout(
+            xaxis_title=labels[x],
+            yaxis_title=labels[y],
+            hovermode='closest',
+            spikedistance=-1,
+            uirevision='static'
+        )
+
+        return fig
+
+    @st.cache_data(show_spinner=False)
+    def create_efficiency_scatter(_self, merged_df):
         """Create efficiency scatter plot"""
-        # Filter for valid data
-        scatter_df = merged_df[
-            (merged_df['Year_total_KwH'] > 0) & 
-            (merged_df['kwh_per_m2'] > 0) & 
-            (merged_df['kwh_per_student'] > 0)
-        ].copy()
-        
+        # Filter for valid data with a single fused mask
+        mask = merged_df['Year_total_KwH'].to_numpy() > 0
+        mask &= merged_df['kwh_per_m2'].to_numpy() > 0
+        mask &= merged_df['kwh_per_student'].to_numpy() > 0
+        scatter_df = merged_df[mask]
+
         if not scatter_df.empty:
-            fig = px.scatter(
+            fig = _self._efficiency_figure(
                 scatter_df,
                 x='kwh_per_m2',
                 y='kwh_per_student',
-                size='Year_total_KwH',
-                color='City',
                 hover_data=['project_name'],
                 title='Energieffektivitet: kWh per Student vs kWh per m²',
                 labels={
@@ -412,62 +486,58 @@ class ChartUtils:
                     'Year_total_KwH': 'Totalt Forbruk'
                 }
             )
-            
+
             # Add quadrant lines
             if scatter_df['kwh_per_m2'].notna().any() and scatter_df['kwh_per_student'].notna().any():
                 avg_per_m2 = scatter_df['kwh_per_m2'].mean()
                 avg_per_student = scatter_df['kwh_per_student'].mean()
-                
-                fig.add_hline(y=avg_per_student, line_dash="dash", line_color="gray", 
+
+                fig.add_hline(y=avg_per_student, line_dash="dash", line_color="gray",
                              annotation_text="Snitt kWh/student")
-                fig.add_vline(x=avg_per_m2, line_dash="dash", line_color="gray", 
+                fig.add_vline(x=avg_per_m2, line_dash="dash", line_color="gray",
                              annotation_text="Snitt kWh/m²")
-            
+
             return fig
         else:
-            fig = go.Figure()
-            fig.add_annotation(
-                text="Ingen data tilgjengelig for effektivitetssammenligning",
-                xref="paper", yref="paper",
-                x=0.5, y=0.5, xanchor='center', yanchor='middle',
-                showarrow=False, font_size=16
+            return _self._empty_fig(
+                'Energieffektivitetssammenligning',
+                text="Ingen data tilgjengelig for effektivitetssammenligning"
             )
-            fig.update_layout(title='Energieffektivitetssammenligning')
-            return fig
     
-    def prepare_export_data(self, electricity_df, static_df, temp_df):
-        """Prepare comprehensive data for export"""
-        from data_processor import DataProcessor
-        processor = DataProcessor()
-        
-        # Merge all relevant data
-        merged_df = processor.merge_consumption_with_static(electricity_df, static_df)
-        
-        # Add temperature data summary
-        temp_summary = temp_df.groupby('City')['Temperature'].agg(['mean', 'min', 'max']).reset_index()
-        temp_summary.columns = ['City', 'avg_temperature', 'min_temperature', 'max_temperature']
-        
-        # Final merge
-        export_df = pd.merge(merged_df, temp_summary, on='City', how='left')
-        
+    @st.cache_data(show_spinner=False)
+    def prepare_export_data(_self, merged_df, temp_df):
+        """Prepare comprehensive data for export from an already-merged frame"""
+        # Add temperature data summary via per-city maps; the named agg runs
+        # one fused pass and the tiny stats frame maps cheaper than a merge
+        temp_stats = temp_df.groupby('City', sort=False, observed=True).agg(
+            avg_temperature=('Temperature', 'mean'),
+            min_temperature=('Temperature', 'min'),
+            max_temperature=('Temperature', 'max')
+        ).astype('float32')
+
+        export_df = merged_df.copy()
+        for col in temp_stats.columns:
+            # Mapping through the categorical City yields categorical stat
+            # columns, so cast back to the intended float32
+            export_df[col] = export_df['City'].map(temp_stats[col]).astype('float32')
+
         return export_df
     
-    def create_efficiency_chart_from_merged(self, merged_df):
+    @st.cache_data(show_spinner=False)
+    def create_efficiency_chart_from_merged(_self, merged_df):
         """Create efficiency chart from merged data"""
-        # Filter out projects with no consumption or capacity data
-        efficiency_df = merged_df[
-            (merged_df['Year_total_KwH'] > 0) & 
-            (merged_df['total_HE'] > 0) & 
-            (merged_df['kwh_per_student'] > 0)
-        ].copy()
-        
+        # Filter out projects with no consumption or capacity data using a
+        # single fused mask
+        mask = merged_df['Year_total_KwH'].to_numpy() > 0
+        mask &= merged_df['total_HE'].to_numpy() > 0
+        mask &= merged_df['kwh_per_student'].to_numpy() > 0
+        efficiency_df = merged_df[mask]
+
         if not efficiency_df.empty:
-            fig = px.scatter(
+            return _self._efficiency_figure(
                 efficiency_df,
                 x='total_HE',
                 y='kwh_per_student',
-                size='Year_total_KwH',
-                color='City',
                 hover_data=['project_name', 'Year_total_KwH'],
                 title='Energieffektivitet: kWh per Student vs Antall Studenter',
                 labels={
@@ -476,55 +546,48 @@ class ChartUtils:
                     'Year_total_KwH': 'Totalt Forbruk'
                 }
             )
-            
-            fig.update_layout(
-                xaxis_title='Antall Studenter (HE)',
-                yaxis_title='kWh per Student'
-            )
-            
-            return fig
         else:
-            fig = go.Figure()
-            fig.add_annotation(
-                text="Ingen effektivitetsdata tilgjengelig",
-                xref="paper", yref="paper",
-                x=0.5, y=0.5, xanchor='center', yanchor='middle',
-                showarrow=False, font_size=16
+            return _self._empty_fig(
+                'Energieffektivitetsanalyse',
+                text="Ingen effektivitetsdata tilgjengelig"
             )
-            fig.update_layout(title='Energieffektivitetsanalyse')
-            return fig
     
-    def create_project_comparison_chart(self, comparison_data):
+    @st.cache_data(show_spinner=False)
+    def create_project_comparison_chart(_self, comparison_data):
         """Create comparison chart for selected projects"""
         try:
             if comparison_data.empty:
                 return go.Figure()
             
-            # Create grouped bar chart comparing projects
+            project_names = comparison_data['project_name'].to_numpy()
+            student_vals = comparison_data['kwh_per_student'].to_numpy()
+            m2_vals = comparison_data['kwh_per_m2'].to_numpy()
+
+            # Create grouped bar chart comparing projects; the second trace
+            # rides the secondary y-axis
             fig = go.Figure()
-            
-            # Add kWh per student bars
-            fig.add_trace(go.Bar(
-                name='kWh per student',
-                x=comparison_data['project_name'],
-                y=comparison_data['kwh_per_student'],
-                yaxis='y',
-                marker_color='lightblue',
-                text=comparison_data['kwh_per_student'].round(0),
-                textposition='auto',
-            ))
-            
-            # Add kWh per m² bars on secondary y-axis
-            fig.add_trace(go.Bar(
-                name='kWh per m²',
-                x=comparison_data['project_name'],
-                y=comparison_data['kwh_per_m2'],
-                yaxis='y2',
-                marker_color='lightcoral',
-                text=comparison_data['kwh_per_m2'].round(0),
-                textposition='auto',
-                opacity=0.7
-            ))
+
+            fig.add_traces([
+                go.Bar(
+                    name='kWh per student',
+                    x=project_names,
+                    y=student_vals,
+                    yaxis='y',
+                    marker_color='lightblue',
+                    text=np.rint(student_vals),
+                    textposition='auto',
+                ),
+                go.Bar(
+                    name='kWh per m²',
+                    x=project_names,
+                    y=m2_vals,
+                    yaxis='y2',
+                    marker_color='lightcoral',
+                    text=np.rint(m2_vals),
+                    textposition='auto',
+                    opacity=0.7
+                ),
+            ])
             
             # Update layout for dual y-axis
             fig.update_layout(
@@ -540,35 +603,35 @@ class ChartUtils:
                     overlaying='y'
                 ),
                 barmode='group',
-                height=500
+                height=500,
+                uirevision='static'
             )
             
             return fig
             
         except Exception as e:
-            fig = go.Figure()
-            fig.add_annotation(
+            return _self._empty_fig(
+                'Prosjektsammenligning',
                 text=f"Feil ved oppretting av sammenligningsdiagram: {str(e)}",
-                xref="paper", yref="paper",
-                x=0.5, y=0.5, xanchor='center', yanchor='middle',
-                showarrow=False, font_size=14
+                font_size=14
             )
-            fig.update_layout(title='Prosjektsammenligning')
-            return fig
     
-    def create_project_comparison_chart_student(self, comparison_data):
+    @st.cache_data(show_spinner=False)
+    def create_project_comparison_chart_student(_self, comparison_data):
         """Create comparison chart for kWh per student"""
         try:
             if comparison_data.empty:
                 return go.Figure()
             
+            student_vals = comparison_data['kwh_per_student'].to_numpy()
+
             fig = go.Figure()
-            
+
             fig.add_trace(go.Bar(
-                x=comparison_data['project_name'],
-                y=comparison_data['kwh_per_student'],
+                x=comparison_data['project_name'].to_numpy(),
+                y=student_vals,
                 marker_color='lightblue',
-                text=comparison_data['kwh_per_student'].round(0),
+                text=np.rint(student_vals),
                 textposition='auto',
             ))
             
@@ -576,35 +639,35 @@ class ChartUtils:
                 title='kWh per Student Sammenligning',
                 xaxis_title='Prosjekt',
                 yaxis_title='kWh per Student',
-                height=400
+                height=400,
+                uirevision='static'
             )
             
             return fig
             
         except Exception as e:
-            fig = go.Figure()
-            fig.add_annotation(
+            return _self._empty_fig(
+                'kWh per Student Sammenligning',
                 text=f"Feil ved oppretting av sammenligningsdiagram: {str(e)}",
-                xref="paper", yref="paper",
-                x=0.5, y=0.5, xanchor='center', yanchor='middle',
-                showarrow=False, font_size=14
+                font_size=14
             )
-            fig.update_layout(title='kWh per Student Sammenligning')
-            return fig
     
-    def create_project_comparison_chart_m2(self, comparison_data):
+    @st.cache_data(show_spinner=False)
+    def create_project_comparison_chart_m2(_self, comparison_data):
         """Create comparison chart for kWh per m²"""
         try:
             if comparison_data.empty:
                 return go.Figure()
             
+            m2_vals = comparison_data['kwh_per_m2'].to_numpy()
+
             fig = go.Figure()
-            
+
             fig.add_trace(go.Bar(
-                x=comparison_data['project_name'],
-                y=comparison_data['kwh_per_m2'],
+                x=comparison_data['project_name'].to_numpy(),
+                y=m2_vals,
                 marker_color='lightcoral',
-                text=comparison_data['kwh_per_m2'].round(0),
+                text=np.rint(m2_vals),
                 textposition='auto',
             ))
             
@@ -612,18 +675,15 @@ class ChartUtils:
                 title='kWh per m² Sammenligning',
                 xaxis_title='Prosjekt',
                 yaxis_title='kWh per m²',
-                height=400
+                height=400,
+                uirevision='static'
             )
             
             return fig
             
         except Exception as e:
-            fig = go.Figure()
-            fig.add_annotation(
+            return _self._empty_fig(
+                'kWh per m² Sammenligning',
                 text=f"Feil ved oppretting av sammenligningsdiagram: {str(e)}",
-                xref="paper", yref="paper",
-                x=0.5, y=0.5, xanchor='center', yanchor='middle',
-                showarrow=False, font_size=14
+                font_size=14
             )
-            fig.update_layout(title='kWh per m² Sammenligning')
-            return fig
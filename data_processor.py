@@ -1,32 +1,57 @@
+import functools
+from concurrent.futures import ThreadPoolExecutor
 import pandas as pd
 import numpy as np
 from datetime import datetime
 import os
 
 class DataProcessor:
+    # Wide monthly consumption columns in calendar order, keyed by month number
+    MONTH_COLUMNS = {
+        1: 'Jan_KwH', 2: 'Feb_KwH', 3: 'Mar_KwH', 4: 'Apr__KwH',
+        5: 'may__KwH', 6: 'Jun_KwH', 7: 'Jul_KwH', 8: 'Aug_KwH',
+        9: 'Sep_KwH', 10: 'Oct_KwH', 11: 'Nov_KwH', 12: 'Dec_KwH'
+    }
+
     def __init__(self):
         self.data_dir = "attached_assets"
-    
+
+    def read_csv_cached(self, file_path, **read_csv_kwargs):
+        """Read a CSV through a Parquet mirror so reloads skip the text parse"""
+        parquet_path = os.path.splitext(file_path)[0] + '.parquet'
+        try:
+            if os.path.exists(parquet_path) and os.path.getmtime(parquet_path) >= os.path.getmtime(file_path):
+                return pd.read_parquet(parquet_path)
+            df = pd.read_csv(file_path, **read_csv_kwargs)
+            df.to_parquet(parquet_path, index=False)
+            return df
+        except Exception:
+            # Fall back to plain CSV parsing if no Parquet engine is available
+            # or the mirror is unreadable
+            return pd.read_csv(file_path, **read_csv_kwargs)
+
     def load_temperature_data(self):
         """Load and process temperature data with degree days calculation"""
         try:
             file_path = os.path.join(self.data_dir, "temperature_data_1755935412803.csv")
-            df = pd.read_csv(file_path)
-            
-            # Clean and process the data
-            df['Temperature'] = pd.to_numeric(df['Temperature'], errors='coerce')
-            
-            # Parse time column to create proper date
-            df['Month_Year'] = df['Time'].str.replace('.', '/20')  # Convert aug.20 to aug/2020
-            
-            # Create proper date columns
+            # Declaring dtypes up front lets the C parser land columns in
+            # their final width without a second inference scan
+            df = self.read_csv_cached(file_path, dtype={
+                'City': 'string', 'Time': 'string', 'Temperature': 'float32'
+            })
+
+            # Create proper date columns (Time is e.g. 'aug.20' with Norwegian
+            # month abbreviations, so strftime formats do not apply)
             month_map = {
                 'jan': 1, 'feb': 2, 'mar': 3, 'apr': 4, 'mai': 5, 'jun': 6,
                 'jul': 7, 'aug': 8, 'sep': 9, 'okt': 10, 'nov': 11, 'des': 12
             }
-            
+
             df['Month'] = df['Time'].str[:3].map(month_map)
             df['Year'] = df['Time'].str[4:].astype(int) + 2000
+
+            # Compact datetime64 stamp instead of the old month/year string
+            df['Month_Year'] = pd.to_datetime({'year': df['Year'], 'month': df['Month'], 'day': 1})
             
             # Calculate heating degree days (HDD) with base temperature 17°C
             base_temp = 17.0
@@ -53,17 +78,22 @@ class DataProcessor:
         """Load and process static project data"""
         try:
             file_path = os.path.join(self.data_dir, "static_data_updated_1756108797611.csv")
-            df = pd.read_csv(file_path)
-            
+            # The numeric columns contain malformed values (e.g. bracketed
+            # coordinate lists), so they still need coercion; only the text
+            # columns get parsed straight into their final dtype
+            df = self.read_csv_cached(file_path, dtype={
+                'project_type': 'string', 'city': 'string', 'project_name': 'string'
+            })
+
             # Filter only student housing projects
             df = df[df['project_type'] == 'studentboliger']
-            
+
             # Clean numeric columns
             numeric_columns = ['year_built', 'lat', 'lon', 'total_HE', 'Total_BRA']
             for col in numeric_columns:
                 if col in df.columns:
                     df[col] = pd.to_numeric(df[col], errors='coerce')
-            
+
             # Standardize city column name to match electricity data
             if 'city' in df.columns:
                 df = df.rename(columns={'city': 'City'})
@@ -79,15 +109,15 @@ class DataProcessor:
                 'TRONDHEIM': (63.4305, 10.3951)
             }
             
-            for idx, row in df.iterrows():
-                if pd.isna(row['lat']) or pd.isna(row['lon']):
-                    city = row['City']
-                    if city in city_coordinates:
-                        # Add small random offset to avoid exact overlap
-                        base_lat, base_lon = city_coordinates[city]
-                        offset = (idx % 10) * 0.001  # Small offset based on row index
-                        df.at[idx, 'lat'] = base_lat + offset
-                        df.at[idx, 'lon'] = base_lon + offset
+            # Fill all missing coordinates in one vectorized pass; the small
+            # index-keyed offset avoids exact overlap, as before
+            missing = df['lat'].isna() | df['lon'].isna()
+            if missing.any():
+                city_lat = {city: lat for city, (lat, _) in city_coordinates.items()}
+                city_lon = {city: lon for city, (_, lon) in city_coordinates.items()}
+                offset = pd.Series((df.index.to_numpy() % 10) * 0.001, index=df.index)
+                df.loc[missing, 'lat'] = (df['City'].map(city_lat) + offset)[missing]
+                df.loc[missing, 'lon'] = (df['City'].map(city_lon) + offset)[missing]
             
             # Remove rows that still don't have coordinates
             df_with_coords = df.dropna(subset=['lat', 'lon'])
@@ -111,32 +141,39 @@ class DataProcessor:
                 # Use the most recent file
                 file_path = max(electricity_files, key=os.path.getmtime)
             
+            # Parse the monthly columns straight into float32
+            dtype_map = {col: 'float32' for col in self.MONTH_COLUMNS.values()}
+            dtype_map.update({'Year': 'int32', 'Year_total_KwH': 'float32',
+                              'project_name': 'string', 'City': 'string'})
+
             # Try comma separator first (new format), then semicolon (old format)
             try:
-                df = pd.read_csv(file_path, sep=',', encoding='utf-8-sig')
+                df = self.read_csv_cached(file_path, sep=',', encoding='utf-8-sig', dtype=dtype_map)
             except:
-                df = pd.read_csv(file_path, sep=';', encoding='utf-8-sig')
-            
+                df = self.read_csv_cached(file_path, sep=';', encoding='utf-8-sig', dtype=dtype_map)
+
             # Clean column names
             df.columns = df.columns.str.strip()
-            
-            # Convert numeric columns
-            numeric_columns = [col for col in df.columns if 'KwH' in col or col == 'Year']
-            for col in numeric_columns:
-                if col in df.columns:
-                    df[col] = pd.to_numeric(df[col], errors='coerce')
-            
+
             # Clean city names
-            df['City'] = df['City'].str.upper().str.strip()
-            
-            # Fix city name mappings to match static data
+            df['City'] = df['City'].str.upper().str.strip().astype('category')
+
+            # Fix city name mappings to match static data by recoding the
+            # small categories index instead of rescanning every row; a plain
+            # rename is not enough because JAKOBSLI merges into TRONDHEIM
             city_mapping = {
                 'JAKOBSLI': 'TRONDHEIM',  # Jakobsliveien 55 is actually in Trondheim
                 'ÅLESUND': 'ÅLESUND',
                 'GJØVIK': 'GJØVIK',
                 'TRONDHEIM': 'TRONDHEIM'
             }
-            df['City'] = df['City'].map(city_mapping).fillna(df['City'])
+            mapped = df['City'].cat.categories.map(lambda c: city_mapping.get(c, c))
+            merged_cats = pd.Index(mapped.unique())
+            # Keep the -1 sentinel for missing cities; raw codes would let it
+            # wrap around to the last category
+            codes = df['City'].cat.codes.to_numpy()
+            new_codes = np.where(codes >= 0, merged_cats.get_indexer(mapped)[codes], -1)
+            df['City'] = pd.Categorical.from_codes(new_codes, categories=merged_cats)
             
             # Rename columns for consistency
             if 'project_name' in df.columns:
@@ -150,26 +187,72 @@ class DataProcessor:
     
     def load_all_data(self):
         """Load all data files and return as dictionary"""
-        return {
-            'temperature': self.load_temperature_data(),
-            'static': self.load_static_data(),
-            'electricity': self.load_electricity_data()
-        }
+        # Parse the three independent files concurrently; the CSV C engine
+        # releases the GIL, so wall time drops to roughly the slowest file
+        with ThreadPoolExecutor(max_workers=3) as pool:
+            futures = {
+                'temperature': pool.submit(self.load_temperature_data),
+                'static': pool.submit(self.load_static_data),
+                'electricity': pool.submit(self.load_electricity_data)
+            }
+            data = {name: future.result() for name, future in futures.items()}
+
+        # Convert low-cardinality text columns to category dtype so the
+        # filter paths (==, isin, unique) compare integer codes instead of
+        # hashing strings on every rerun
+        for df in data.values():
+            for col in ['City', 'project_name', 'project_type']:
+                if col in df.columns:
+                    df[col] = df[col].astype('category')
+            if 'Year' in df.columns:
+                df['Year'] = df['Year'].astype('int32')
+
+            # Downcast the measurement columns: float32/int32 are ample for
+            # kWh totals, temperatures and counts, and halve memory traffic
+            for col in df.select_dtypes('float64').columns:
+                df[col] = df[col].astype('float32')
+            for col in df.select_dtypes('int64').columns:
+                df[col] = df[col].astype('int32')
+
+        return data
     
+    def melt_monthly_consumption(self, electricity_df):
+        """Reshape the wide monthly columns into a tidy long frame
+
+        Returns one row per (project, city, year, month) with the consumption
+        in a single 'KwH' column, so chart code can aggregate with plain
+        groupbys instead of re-deriving the month layout.
+        """
+        value_vars = [col for col in self.MONTH_COLUMNS.values() if col in electricity_df.columns]
+        id_vars = [col for col in ['project_name', 'City', 'Year'] if col in electricity_df.columns]
+
+        long_df = electricity_df.melt(
+            id_vars=id_vars, value_vars=value_vars,
+            var_name='month_col', value_name='KwH'
+        )
+        col_to_month = {col: month for month, col in self.MONTH_COLUMNS.items()}
+        long_df['Month'] = long_df['month_col'].map(col_to_month).astype('int32')
+
+        return long_df.drop(columns='month_col')
+
+    @staticmethod
+    @functools.lru_cache(maxsize=4)
+    def _monthly_cols(cols_tuple):
+        """Monthly consumption columns of a frame, cached per column layout"""
+        cols = pd.Index(cols_tuple)
+        mask = cols.str.contains('KwH', regex=False) & (cols != 'Year_total_KwH')
+        return cols[mask].tolist()
+
     def calculate_monthly_totals(self, electricity_df):
         """Calculate monthly totals across all projects"""
-        monthly_columns = [col for col in electricity_df.columns if 'KwH' in col and col != 'Year_total_KwH']
-        
-        monthly_data = []
-        for col in monthly_columns:
-            month_name = col.replace('_KwH', '').replace('__KwH', '')
-            total = electricity_df[col].sum()
-            monthly_data.append({
-                'Month': month_name,
-                'Total_KwH': total
-            })
-        
-        return pd.DataFrame(monthly_data)
+        monthly_columns = self._monthly_cols(tuple(electricity_df.columns))
+
+        # Sum all months in one vectorized pass and build the frame from
+        # columnar arrays instead of a list of per-month dicts
+        month_names = [col.replace('_KwH', '').replace('__KwH', '') for col in monthly_columns]
+        totals = electricity_df[monthly_columns].sum().to_numpy()
+
+        return pd.DataFrame({'Month': month_names, 'Total_KwH': totals})
     
     def merge_consumption_with_static(self, electricity_df, static_df, selected_year=None):
         """Merge electricity consumption with static data for analysis"""
@@ -183,13 +266,13 @@ class DataProcessor:
         # Group electricity data by project
         if selected_year and selected_year != 'Alle':
             # For specific year, just take the values (no summing needed)
-            consumption_summary = electricity_filtered.groupby('project_name').agg({
+            consumption_summary = electricity_filtered.groupby('project_name', observed=True).agg({
                 'Year_total_KwH': 'first',  # Use first since there should be only one row per project per year
                 'City': 'first'
             }).reset_index()
         else:
             # For "Alle" years, sum across all years
-            consumption_summary = electricity_filtered.groupby('project_name').agg({
+            consumption_summary = electricity_filtered.groupby('project_name', observed=True).agg({
                 'Year_total_KwH': 'sum',
                 'City': 'first'
             }).reset_index()
@@ -207,18 +290,20 @@ class DataProcessor:
         if 'City_elec' in merged_df.columns:
             merged_df = merged_df.drop('City_elec', axis=1)
         
-        # Calculate efficiency metrics
-        merged_df['kwh_per_student'] = np.where(
-            (merged_df['total_HE'] > 0) & (merged_df['Year_total_KwH'].notna()),
-            merged_df['Year_total_KwH'] / merged_df['total_HE'],
-            0
-        )
-        
-        merged_df['kwh_per_m2'] = np.where(
-            (merged_df['Total_BRA'] > 0) & (merged_df['Year_total_KwH'].notna()),
-            merged_df['Year_total_KwH'] / merged_df['Total_BRA'],
-            0
-        )
+        # The join widens project_name back to plain strings; restore category
+        # dtype so downstream isin()/color grouping compare integer codes
+        merged_df['project_name'] = merged_df['project_name'].astype('category')
+
+        # Calculate efficiency metrics in one float32 divide per metric; rows
+        # with NaN consumption are dropped below, so the notna guard the old
+        # two-pass np.where needed is redundant here
+        kwh = merged_df['Year_total_KwH'].to_numpy(dtype='float32', copy=False)
+        he = merged_df['total_HE'].to_numpy(dtype='float32', copy=False)
+        bra = merged_df['Total_BRA'].to_numpy(dtype='float32', copy=False)
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            merged_df['kwh_per_student'] = np.where(he > 0, kwh / he, np.float32(0))
+            merged_df['kwh_per_m2'] = np.where(bra > 0, kwh / bra, np.float32(0))
         
         # Fill NaN values in consumption data with 0
         merged_df['Year_total_KwH'] = merged_df['Year_total_KwH'].fillna(0)
@@ -7,51 +7,42 @@ class MapUtils:
         self.default_center = [63.4305, 10.3951]  # Trondheim coordinates
         self.zoom_start = 10
     
+    def get_efficiency_color_gradients(self, efficiency_values, min_val, max_val):
+        """Vectorized green-to-red gradient colors for an array of values"""
+        values = np.asarray(efficiency_values, dtype='float64')
+        invalid = np.isnan(values) | (values == 0)
+
+        if min_val >= max_val:
+            # Default if no variation
+            return np.where(invalid, 'black', 'green')
+
+        # Normalize values to 0-1 scale and interpolate the green -> yellow ->
+        # orange -> red ramp per channel over the whole array
+        normalized = np.clip((np.nan_to_num(values) - min_val) / (max_val - min_val), 0, 1)
+
+        r = np.interp(normalized, [0, 0.33, 0.66, 1.0], [0, 255, 255, 255]).astype(np.uint8)
+        g = np.interp(normalized, [0, 0.33, 0.66, 1.0], [255, 255, 128, 0]).astype(np.uint8)
+
+        colors = np.array([f'#{rv:02x}{gv:02x}00' for rv, gv in zip(r, g)], dtype=object)
+        colors[invalid] = 'black'
+        return colors
+
     def get_efficiency_color_gradient(self, efficiency_value, min_val, max_val):
         """Get color based on efficiency metric using continuous gradient from green to red"""
-        if pd.isna(efficiency_value) or efficiency_value == 0:
-            return 'black'
-        
-        if min_val >= max_val:
-            return 'green'  # Default if no variation
-        
-        # Normalize value to 0-1 scale
-        normalized = (efficiency_value - min_val) / (max_val - min_val)
-        normalized = max(0, min(1, normalized))  # Clamp to 0-1
-        
-        # Create gradient from green (low) to red (high)
-        # Green to Yellow to Orange to Red
-        if normalized <= 0.33:
-            # Green to Yellow
-            factor = normalized / 0.33
-            r = int(factor * 255)
-            g = 255
-            b = 0
-        elif normalized <= 0.66:
-            # Yellow to Orange
-            factor = (normalized - 0.33) / 0.33
-            r = 255
-            g = int(255 * (1 - factor * 0.5))  # Fade from 255 to 128
-            b = 0
-        else:
-            # Orange to Red
-            factor = (normalized - 0.66) / 0.34
-            r = 255
-            g = int(128 * (1 - factor))  # Fade from 128 to 0
-            b = 0
-        
-        return f'#{r:02x}{g:02x}{b:02x}'
-    
+        return self.get_efficiency_color_gradients([efficiency_value], min_val, max_val)[0]
+
+    def get_consumption_sizes(self, consumption_values):
+        """Vectorized marker sizes for an array of consumption values"""
+        values = np.nan_to_num(np.asarray(consumption_values, dtype='float64'))
+        return np.select(
+            [values == 0, values > 1000000, values > 100000],
+            [5, 15, 10],
+            default=7
+        )
+
     def get_consumption_size(self, consumption):
         """Get marker size based on consumption level"""
-        if pd.isna(consumption) or consumption == 0:
-            return 5
-        elif consumption > 1000000:
-            return 15
-        elif consumption > 100000:
-            return 10
-        else:
-            return 7
+        return int(self.get_consumption_sizes([consumption])[0])
     
     def create_energy_map(self, merged_df, color_metric='kwh_per_m2', global_min_max=None):
         """Create an interactive map showing energy efficiency"""
@@ -80,58 +71,66 @@ class MapUtils:
             else:
                 min_val = max_val = 0
         
-        # Add markers for each project
-        for idx, row in merged_df.iterrows():
-            if pd.notna(row['lat']) and pd.notna(row['lon']):
-                project_name = row['project_name']
-                consumption = row['Year_total_KwH'] if pd.notna(row['Year_total_KwH']) else 0
-                students = row['total_HE'] if pd.notna(row['total_HE']) else 0
-                kwh_per_student = row['kwh_per_student'] if pd.notna(row['kwh_per_student']) else 0
-                kwh_per_m2 = row['kwh_per_m2'] if pd.notna(row['kwh_per_m2']) else 0
-                
-                # Create popup content in Norwegian
-                popup_content = f"""
-                <b>{project_name}</b><br>
-                By: {row['City']}<br>
-                Studenter: {students:.0f}<br>
-                Årlig forbruk: {consumption:,.1f} kWh<br>
-                kWh per student: {kwh_per_student:.1f}<br>
-                kWh per m²: {kwh_per_m2:.1f}<br>
-                Byggeår: {row['year_built'] if pd.notna(row['year_built']) else 'N/A'}
-                """
-                
-                # Get color based on selected metric using gradient
-                efficiency_value = row[color_metric] if pd.notna(row[color_metric]) else 0
-                color = self.get_efficiency_color_gradient(efficiency_value, min_val, max_val)
-                
-                # Add marker
-                folium.CircleMarker(
-                    location=[row['lat'], row['lon']],
-                    radius=self.get_consumption_size(consumption),
-                    popup=folium.Popup(popup_content, max_width=300),
-                    color=color,
-                    fill=True,
-                    fillColor=color,
-                    fillOpacity=0.7,
-                    weight=2
-                ).add_to(m)
-        
+        # Colors and sizes come from one vectorized pass over the frame
+        colors = self.get_efficiency_color_gradients(
+            merged_df[color_metric].to_numpy(), min_val, max_val
+        )
+        sizes = self.get_consumption_sizes(merged_df['Year_total_KwH'].to_numpy())
+
+        # Pre-render the Norwegian popup HTML with vectorized string passes;
+        # only the thousands-grouped kWh figure needs Python formatting
+        students_txt = np.char.mod('%.0f', np.nan_to_num(merged_df['total_HE'].to_numpy(dtype='float64')))
+        kwh_txt = np.array([f'{v:,.1f}' for v in np.nan_to_num(merged_df['Year_total_KwH'].to_numpy(dtype='float64'))])
+        per_student_txt = np.char.mod('%.1f', np.nan_to_num(merged_df['kwh_per_student'].to_numpy(dtype='float64')))
+        per_m2_txt = np.char.mod('%.1f', np.nan_to_num(merged_df['kwh_per_m2'].to_numpy(dtype='float64')))
+        year_built = merged_df['year_built'].to_numpy(dtype='float64')
+        year_built_txt = np.where(np.isnan(year_built), 'N/A', year_built.astype(object)).astype(str)
+
+        popups = (
+            '<b>' + merged_df['project_name'].astype(str) + '</b><br>'
+            + 'By: ' + merged_df['City'].astype(str) + '<br>'
+            + 'Studenter: ' + students_txt + '<br>'
+            + 'Årlig forbruk: ' + kwh_txt + ' kWh<br>'
+            + 'kWh per student: ' + per_student_txt + '<br>'
+            + 'kWh per m²: ' + per_m2_txt + '<br>'
+            + 'Byggeår: ' + year_built_txt
+        ).to_numpy()
+
+        # Add markers for each project, iterating plain arrays instead of the
+        # per-row Series that iterrows builds
+        for lat, lon, popup_html, color, size in zip(
+            merged_df['lat'].to_numpy(), merged_df['lon'].to_numpy(), popups, colors, sizes
+        ):
+            if pd.isna(lat) or pd.isna(lon):
+                continue
+
+            folium.CircleMarker(
+                location=[lat, lon],
+                radius=int(size),
+                popup=folium.Popup(popup_html, max_width=300),
+                color=color,
+                fill=True,
+                fillColor=color,
+                fillOpacity=0.7,
+                weight=2
+            ).add_to(m)
+
         return m, min_val, max_val
     
     def create_city_overview_map(self, static_df, electricity_df):
         """Create a map showing city-level consumption overview"""
-        # Group data by city
-        city_consumption = electricity_df.groupby('City').agg({
-            'Year_total_KwH': 'sum',
-            'project_name': 'count'
-        }).reset_index()
-        city_consumption.columns = ['City', 'Total_Consumption', 'Project_Count']
-        
+        # Group data by city; named aggs run each frame in one fused pass and
+        # skip the rename afterwards
+        city_consumption = electricity_df.groupby('City', observed=True, sort=False).agg(
+            Total_Consumption=('Year_total_KwH', 'sum'),
+            Project_Count=('project_name', 'count')
+        ).reset_index()
+
         # Get average coordinates for each city
-        city_coords = static_df.groupby('City').agg({
-            'lat': 'mean',
-            'lon': 'mean'
-        }).reset_index()
+        city_coords = static_df.groupby('City', observed=True, sort=False).agg(
+            lat=('lat', 'mean'),
+            lon=('lon', 'mean')
+        ).reset_index()
         
         # Merge consumption data with coordinates
         city_data = pd.merge(city_coords, city_consumption, on='City', how='inner')
@@ -143,27 +142,35 @@ class MapUtils:
             tiles='OpenStreetMap'
         )
         
-        # Add markers for each city
-        for idx, row in city_data.iterrows():
-            if pd.notna(row['lat']) and pd.notna(row['lon']):
-                popup_content = f"""
-                <b>{row['City']}</b><br>
-                Projects: {row['Project_Count']}<br>
-                Total Consumption: {row['Total_Consumption']:,.0f} kWh
-                """
-                
-                # Size based on consumption
-                marker_size = min(30, max(10, row['Total_Consumption'] / 100000))
-                
-                folium.CircleMarker(
-                    location=[row['lat'], row['lon']],
-                    radius=marker_size,
-                    popup=folium.Popup(popup_content, max_width=200),
-                    color='blue',
-                    fill=True,
-                    fillColor='lightblue',
-                    fillOpacity=0.6,
-                    weight=2
-                ).add_to(m)
-        
+        # Add markers for each city from plain column arrays
+        for city, lat, lon, total_consumption, project_count in zip(
+            city_data['City'].to_numpy(),
+            city_data['lat'].to_numpy(),
+            city_data['lon'].to_numpy(),
+            city_data['Total_Consumption'].to_numpy(),
+            city_data['Project_Count'].to_numpy()
+        ):
+            if pd.isna(lat) or pd.isna(lon):
+                continue
+
+            popup_content = f"""
+            <b>{city}</b><br>
+            Projects: {project_count}<br>
+            Total Consumption: {total_consumption:,.0f} kWh
+            """
+
+            # Size based on consumption
+            marker_size = min(30, max(10, total_consumption / 100000))
+
+            folium.CircleMarker(
+                location=[lat, lon],
+                radius=marker_size,
+                popup=folium.Popup(popup_content, max_width=200),
+                color='blue',
+                fill=True,
+                fillColor='lightblue',
+                fillOpacity=0.6,
+                weight=2
+            ).add_to(m)
+
         return m